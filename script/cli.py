@@ -0,0 +1,111 @@
+import time
+
+START_TIME = time.perf_counter()
+
+import argparse
+import sys
+from config import load_config
+
+_startup_reported = False
+
+def report_startup(command):
+    """
+    Prints how long it took to parse the configuration and import the dependencies of a command.
+    """
+    global _startup_reported
+    if not _startup_reported:
+        print(f"Started '{command}' in {time.perf_counter() - START_TIME:.2f} seconds.")
+        _startup_reported = True
+
+def search(config):
+    from search import perform_search, ScopusSearchClient
+    from priority import save_search_results, merge_search_results
+    report_startup("search")
+
+    client = ScopusSearchClient(
+        config['elsevier_apikey'],
+        max_workers=config.get('elsevier_max_workers', 4),
+        requests_per_second=config.get('elsevier_requests_per_second', 5),
+    )
+    search_results = list(perform_search(config['elsevier_apikey'], config['elsevier_query'], client=client))
+    if client.failed_pages:
+        # A partial search must not drop the records saved by an earlier complete one
+        file_path = merge_search_results(search_results, config["scrap_output_folder"])
+        print(f"Skipped {len(client.failed_pages)} page(s) that could not be fetched; merged {len(search_results)} search results into {file_path}")
+    else:
+        file_path = save_search_results(search_results, config["scrap_output_folder"])
+        print(f"Saved {len(search_results)} search results to {file_path}")
+
+def scrape(config):
+    import scrap
+    report_startup("scrape")
+    scrap.run(config)
+
+def summarize(config):
+    import gemini
+    report_startup("summarize")
+    gemini.run(config)
+
+def upload(config):
+    from validate import find_invalid_summaries
+    import notion
+    report_startup("upload")
+
+    # Gemini is only needed when a summary has to be repaired before upload
+    if find_invalid_summaries(config["gemini_output_folder"]):
+        import gemini
+        gemini.validate_folder(config)
+    notion.run(config)
+
+def plan(config):
+    import gemini
+    from ledger import create_ledger
+    report_startup("plan")
+
+    ledger = create_ledger(config)
+    run_plan = gemini.plan(config, ledger=ledger)
+    remaining = ledger.remaining_budget()
+    if remaining is not None and run_plan["total_tokens"] > remaining:
+        print("The planned run exceeds the token budget.")
+        return 1
+    return 0
+
+def run_all(config):
+    import scrap
+    import gemini
+    import notion
+    from ledger import create_ledger
+    from pool import create_pool
+    report_startup("all")
+
+    scrap.run(config)
+    pool = create_pool(config)
+    ledger = create_ledger(config)
+    gemini.run(config, pool=pool, ledger=ledger)
+    gemini.validate_folder(config, pool=pool, ledger=ledger)
+    notion.run(config)
+    print("All scripts have been executed")
+
+COMMANDS = {
+    "search": (search, "Search Scopus and save the results as JSON"),
+    "scrape": (scrape, "Search Scopus and scrape the articles from ScienceDirect"),
+    "plan": (plan, "Estimate the tokens and time needed to summarize the pending articles"),
+    "summarize": (summarize, "Summarize the scraped articles with Gemini"),
+    "upload": (upload, "Validate the summaries and upload them to Notion"),
+    "all": (run_all, "Run every stage in order"),
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ScienceDirect to Notion pipeline")
+    parser.add_argument("--config", default="config.yaml", help="Path to the configuration file (default: config.yaml)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        subparsers.add_parser(name, help=help_text)
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    command, _ = COMMANDS[args.command]
+    return command(config)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+import yaml
+
+def load_config(file_path):
+    with open(file_path, "r", encoding="utf-8") as yaml_file:
+        data_dict = yaml.safe_load(yaml_file)
+    return data_dict
@@ -1,11 +1,15 @@
 import os
+import json
+import shutil
 import time
-import google.generativeai as genai
-from scrap import load_config
-from prompt import construct_prompt, construct_response_schema, construct_system_instruction
-from collections import deque
+from config import load_config
+from ledger import create_ledger, BudgetExceededError
+from pool import create_pool, QuotaExhaustedError
+from priority import PriorityScheduler
+from prompt import construct_prompt, construct_repair_prompt, construct_response_schema
+from validate import validate_summary, build_repair_schema, merge_repair, load_summary, format_path, find_invalid_summaries
 
-MAX_LEN = 10
+MAX_REPAIR_ATTEMPTS = 2
 
 def save_json(file_path, content):
     with open(file_path, "w", encoding='utf-8') as file:
@@ -27,45 +31,173 @@ def read_txt_files(folder_path):
                 txt_files.append((file_path, content))
     return txt_files
 
-def rate_limited_generate_summary(model, prompt, call_queue):
+def summary_path(file_path, scrap_output_folder, gemini_output_folder):
     """
-    Generates a summary using the generative AI model with rate limiting.
+    :return: The path of the summary for a scraped .txt file, mirroring its location within scrap_output_folder.
+    """
+    # Get the relative path of the file with respect to scrap_output_folder
+    relative_path = os.path.relpath(file_path, start=scrap_output_folder)
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(gemini_output_folder, os.path.dirname(relative_path), f"{base_name}_summary.json")
+
+def is_pending(file_path, scrap_output_folder, gemini_output_folder, summarized_files):
+    """
+    :return: Whether a scraped file still needs a Gemini request, i.e. it has no summary yet
+        and none can be copied from summarized_files.
+    """
+    if os.path.exists(summary_path(file_path, scrap_output_folder, gemini_output_folder)):
+        return False
+    summarized_file = summarized_files.get(os.path.splitext(os.path.basename(file_path))[0])
+    return not (summarized_file and os.path.exists(summarized_file))
+
+def rate_limited_generate_summary(pool, prompt, response_schema=None, ledger=None, input_tokens=None, kind="summary"):
+    """
+    Generates a summary with whichever key and model of the pool has capacity.
     
-    :param model: The generative AI model instance.
+    :param pool: The ModelPool routing requests under its rate limits.
     :param prompt: The prompt string to guide the summary generation.
-    :param call_queue: A deque to track the timestamps of API calls.
-    :return: The generated summary text.
+    :param response_schema: The schema of the response. Defaults to the full summary schema.
+    :param ledger: A TokenLedger that checks the token budget before the request and records its usage.
+    :param input_tokens: The already counted input tokens of the prompt. Counted with the API if omitted.
+    :param kind: The request kind recorded in the ledger ("summary" or "repair").
+    :return: A tuple of the generated summary text and the name of the model that produced it.
     """
-    while True:
-        if len(call_queue) < MAX_LEN:
+    if input_tokens is None:
+        input_tokens = pool.count_tokens(prompt)
+    if ledger is not None:
+        ledger.check(input_tokens)
+    ## GET GEMINI RESPONSE ##
+    response, model_name = pool.generate(prompt, response_schema, input_tokens)
+    if ledger is not None:
+        ledger.record(model_name, response.usage_metadata, kind)
+    return response.text, model_name
+
+def repair_summary(pool, content, summary, ledger=None, file_path=None):
+    """
+    Validates a summary and asks the model again only for the fields that are missing or malformed.
+    
+    :param pool: The ModelPool routing requests under its rate limits.
+    :param content: The article text the summary was generated from.
+    :param summary: The parsed summary.
+    :param ledger: A TokenLedger recording the tokens of the follow-up requests.
+    :param file_path: If given, the summary is saved here after every repair, so the fields merged so far
+        are kept when a later attempt stops on the quota or the token budget.
+    :return: A tuple of the repaired summary and the paths that are still invalid.
+    """
+    schema = construct_response_schema()
+    errors = validate_summary(summary, schema)
+    for _ in range(MAX_REPAIR_ATTEMPTS):
+        if not errors:
             break
+        print(f"Repairing {len(errors)} field(s): {', '.join(format_path(path) for path in errors)}")
+        prompt = construct_repair_prompt(content, [format_path(path) for path in errors])
+        repair_text, model_name = rate_limited_generate_summary(pool, prompt, build_repair_schema(schema, errors), ledger, kind="repair")
+        summary = merge_repair(summary, load_summary(repair_text), errors)
+        if model_name not in summary.setdefault("Repaired By", []):
+            summary["Repaired By"].append(model_name)
+        if file_path:
+            save_json(file_path, json.dumps(summary, ensure_ascii=False, indent=2))
+        errors = validate_summary(summary, schema)
+    return summary, errors
+
+def validate_folder(config, pool=None, ledger=None):
+    """
+    Checks every saved summary of one configuration and repairs the invalid ones before upload.
+    
+    :param pool: A shared ModelPool. Created from the configuration if omitted.
+    :param ledger: A shared TokenLedger. Created from the configuration if omitted.
+    """
+    scrap_output_folder = config["scrap_output_folder"]
+    
+    for file_path, summary, _ in find_invalid_summaries(config["gemini_output_folder"]):
+        filename = os.path.basename(file_path)
+        base_name = filename[:-len("_summary.json")]
+        txt_path = os.path.join(scrap_output_folder, f"{base_name}.txt")
+        if not os.path.exists(txt_path):
+            print(f"Cannot repair {filename}: article text {txt_path} not found.")
+            continue
+        with open(txt_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+        
+        if pool is None:
+            pool = create_pool(config)
+        if ledger is None:
+            ledger = create_ledger(config)
+        ledger.set_query(config.get("name") or config["elsevier_query"])
+        try:
+            summary, errors = repair_summary(pool, content, summary, ledger, file_path)
+        except (QuotaExhaustedError, BudgetExceededError) as e:
+            print(f"Stopping validation, keeping the fields repaired so far in {filename}: {e}")
+            return
+        if errors:
+            print(f"Could not repair {filename}: {', '.join(format_path(path) for path in errors)}")
         else:
-            oldest_call_time = call_queue[0]
-            time_since_oldest = time.time() - oldest_call_time
-            if time_since_oldest >= 60:
-                call_queue.popleft()
-                break
-            else:
-                wait_time = 60 - time_since_oldest
-                print(f"Waiting for {wait_time:.2f} seconds to respect RPM limit.")
-                time.sleep(wait_time)
-    start_time = time.time()
-    ## GET GEMINI RESPONSE ##
-    response = model.generate_content(
-        prompt,
-        generation_config=genai.GenerationConfig(
-            response_mime_type="application/json",
-            response_schema=construct_response_schema(),
-        ),
-    )
-    call_queue.append(start_time)
-    return response.text
+            print(f"Repaired {filename}")
 
-def main():
-    # Load configuration
-    config = load_config("config.yaml")
-    genai.configure(api_key=config['gemini_apikey'])
-    model = genai.GenerativeModel(config['gemini_model'], system_instruction=construct_system_instruction())
+def plan(config, pool=None, ledger=None, summarized_files=None):
+    """
+    Estimates the tokens and time needed to summarize the articles that have no summary yet.
+    
+    :param pool: A shared ModelPool. Created from the configuration if omitted.
+    :param ledger: A shared TokenLedger. Created from the configuration if omitted.
+    :param summarized_files: Articles that will be copied from other jobs instead of summarized.
+    :return: A dict with the counted input tokens per file and the estimated totals.
+    """
+    if pool is None:
+        pool = create_pool(config)
+    if ledger is None:
+        ledger = create_ledger(config)
+    summarized_files = summarized_files or {}
+    scrap_output_folder = config["scrap_output_folder"]
+    gemini_output_folder = config["gemini_output_folder"]
+    
+    input_tokens = {}
+    for file_path, content in read_txt_files(scrap_output_folder):
+        if is_pending(file_path, scrap_output_folder, gemini_output_folder, summarized_files):
+            input_tokens[file_path] = pool.count_tokens(construct_prompt(content))
+    
+    requests = len(input_tokens)
+    total_input_tokens = sum(input_tokens.values())
+    total_output_tokens = requests * ledger.estimate_output_tokens()
+    total_repair_tokens = requests * ledger.estimate_repair_tokens()
+    rpm, tpm, rpd = pool.capacity()
+    minutes = max(requests / rpm, (total_input_tokens + total_output_tokens + total_repair_tokens) / tpm) if requests else 0
+    days = requests // rpd
+    
+    print(f"Plan: {requests} articles to summarize")
+    print(f"  Input tokens: {total_input_tokens} (counted)")
+    print(f"  Output tokens: {total_output_tokens} (estimated at {ledger.estimate_output_tokens()} per article)")
+    print(f"  Repair tokens: {total_repair_tokens} (estimated at {ledger.estimate_repair_tokens()} per article)")
+    print(f"  Estimated time: {minutes:.1f} minutes at {rpm} RPM and {tpm} TPM" + (f", over {days + 1} days of quota ({rpd} requests per day)" if days else ""))
+    remaining = ledger.remaining_budget()
+    if remaining is not None:
+        print(f"  Token budget left: {remaining} of {ledger.token_budget}")
+    return {
+        "input_tokens": input_tokens,
+        "total_tokens": total_input_tokens + total_output_tokens + total_repair_tokens,
+        "minutes": minutes,
+    }
+
+def run(config, pool=None, summarized_files=None, ledger=None):
+    """
+    Summarizes every scraped article of one configuration.
+
+    If a token budget is configured, the run is planned first and refused when the
+    estimated tokens exceed the budget; it also stops cleanly once the next request would.
+
+    :param pool: A shared ModelPool. Created from the configuration if omitted.
+    :param ledger: A shared TokenLedger. Created from the configuration if omitted.
+    :param summarized_files: A dict mapping article names to previously written summaries. Articles found
+        here are copied instead of summarized again, and new summaries are added to it.
+        Articles that already have a summary are skipped; validate_folder repairs those.
+    """
+    if pool is None:
+        pool = create_pool(config)
+    if summarized_files is None:
+        summarized_files = {}
+    if ledger is None:
+        ledger = create_ledger(config)
+    ledger.set_query(config.get("name") or config["elsevier_query"])
     
     # Specify the output folders
     scrap_output_folder = config.get("scrap_output_folder", None)
@@ -80,42 +212,84 @@ def main():
     if not os.path.exists(gemini_output_folder):
         os.makedirs(gemini_output_folder)
     
-    # Read all .txt files in the output folder
+    # Read all .txt files in the output folder, most valuable first
     txt_files = read_txt_files(scrap_output_folder)
+    txt_files = PriorityScheduler(config).order(
+        txt_files,
+        key=lambda txt_file: os.path.splitext(os.path.basename(txt_file[0]))[0],
+        is_done=lambda txt_file: os.path.exists(summary_path(txt_file[0], scrap_output_folder, gemini_output_folder)),
+    )
     
     if not txt_files:
         print("No .txt files found in the specified folder.")
     else:
-        # Initialize the call queue for rate limiting
-        call_queue = deque(maxlen=MAX_LEN)
+        input_tokens = {}
+        if ledger.token_budget is not None:
+            run_plan = plan(config, pool, ledger, summarized_files)
+            if run_plan["total_tokens"] > ledger.remaining_budget():
+                print("The planned run exceeds the token budget. Raise token_budget or reduce the articles to summarize.")
+                return
+            input_tokens = run_plan["input_tokens"]
         
         # Process each file
         for idx, (file_path, content) in enumerate(txt_files):
-            prompt = construct_prompt(content)
-
-            summary = rate_limited_generate_summary(model, prompt, call_queue)
-            
-            # Get the relative path of the file with respect to scrap_output_folder
-            relative_path = os.path.relpath(file_path, start=scrap_output_folder)
-            
-            # Create the full output path within gemini_output_folder
-            output_dir = os.path.join(gemini_output_folder, os.path.dirname(relative_path))
+            output_file_path = summary_path(file_path, scrap_output_folder, gemini_output_folder)
+            base_name = os.path.splitext(os.path.basename(file_path))[0]
             
             # Create subdirectories if they don't exist
+            output_dir = os.path.dirname(output_file_path)
             if not os.path.exists(output_dir):
                 os.makedirs(output_dir)
             
-            # Create output file path
-            base_name = os.path.splitext(os.path.basename(file_path))[0]
-            output_file_path = os.path.join(output_dir, f"{base_name}_summary.json")
+            if not is_pending(file_path, scrap_output_folder, gemini_output_folder, summarized_files):
+                summarized_file = summarized_files.get(base_name)
+                if summarized_file and not os.path.exists(output_file_path):
+                    shutil.copyfile(summarized_file, output_file_path)
+                    print(f"Reused previous summary for file {idx+1}/{len(txt_files)}: {file_path}")
+                else:
+                    print(f"Already summarized file {idx+1}/{len(txt_files)}: {file_path}")
+                summarized_files.setdefault(base_name, output_file_path)
+                continue
+            
+            prompt = construct_prompt(content)
+
+            try:
+                summary_text, model_name = rate_limited_generate_summary(pool, prompt, ledger=ledger, input_tokens=input_tokens.get(file_path))
+            except (QuotaExhaustedError, BudgetExceededError) as e:
+                print(f"Stopping after {idx}/{len(txt_files)} files: {e}")
+                return
+            summary = load_summary(summary_text)
+            summary["Model"] = model_name
             
-            # Save
-            save_json(output_file_path, summary)
+            # Save the first pass before repairing so a stop during the repair keeps it
+            save_json(output_file_path, json.dumps(summary, ensure_ascii=False, indent=2))
+            summarized_files[base_name] = output_file_path
+            
+            try:
+                summary, errors = repair_summary(pool, content, summary, ledger, output_file_path)
+            except (QuotaExhaustedError, BudgetExceededError) as e:
+                print(f"Stopping after {idx+1}/{len(txt_files)} files, the summary of {file_path} is left for validation: {e}")
+                return
+            if errors:
+                print(f"Summary still has invalid fields: {', '.join(format_path(path) for path in errors)}")
             
             print(f"Finished processing file {idx+1}/{len(txt_files)}: {file_path}")
             
             # Introduce a delay between calls
             time.sleep(0.5)  # Adjust the sleep duration as needed
 
+def main():
+    # Load configuration
+    config = load_config("config.yaml")
+    run(config)
+
+def plan_main():
+    config = load_config("config.yaml")
+    plan(config)
+
+def validate_main():
+    config = load_config("config.yaml")
+    validate_folder(config)
+
 if __name__ == "__main__":
     main()
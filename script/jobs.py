@@ -0,0 +1,104 @@
+import os
+import sys
+import gemini
+import notion
+import scrap
+from config import load_config
+from scrap import LibrarySession
+from ledger import create_ledger
+from pool import create_pool
+from ratelimit import RateLimiter
+
+DEFAULT_JOBS_FILE = "jobs.yaml"
+REQUIRED_JOB_KEYS = ("elsevier_query", "scrap_output_folder", "gemini_output_folder")
+
+def load_jobs(file_path, base_config):
+    """
+    Reads a job file and merges every job over the base configuration.
+
+    :param file_path: Path to the job file.
+    :param base_config: The configuration shared by all jobs (config.yaml).
+    :return: A list of per-job configuration dicts.
+    """
+    jobs = []
+    for idx, job in enumerate(load_config(file_path).get("jobs") or []):
+        job_config = {**base_config, **job}
+        job_config.setdefault("name", f"job_{idx+1}")
+        for key in REQUIRED_JOB_KEYS:
+            if not job_config.get(key):
+                raise ValueError(f"Job '{job_config['name']}' does not specify '{key}'.")
+        jobs.append(job_config)
+    return jobs
+
+def collect_files(folders, suffix):
+    """
+    Maps article names to existing output files so that articles shared by several jobs are processed once.
+    """
+    files = {}
+    for folder in folders:
+        if not os.path.isdir(folder):
+            continue
+        for filename in os.listdir(folder):
+            if filename.endswith(suffix):
+                files.setdefault(filename[:-len(suffix)], os.path.join(folder, filename))
+    return files
+
+def run_jobs(jobs, base_config):
+    """
+    Runs every stage for all jobs in one process, stage by stage.
+
+    The jobs share one logged-in browser session, one Gemini key and model pool,
+    one token ledger (and budget), and one Notion rate limiter. Articles that several queries have in common are
+    scraped and summarized once and copied into the other jobs' folders.
+    """
+    session = LibrarySession(base_config["yonsei_username"], base_config["yonsei_password"], base_config["chrome_user_agent"])
+    gemini_pool = create_pool(base_config)
+    ledger = create_ledger(base_config)
+    notion_limiter = RateLimiter(notion.NOTION_REQUESTS_PER_SECOND, period=1)
+    scraped_files = collect_files([job["scrap_output_folder"] for job in jobs], ".txt")
+    summarized_files = collect_files([job["gemini_output_folder"] for job in jobs], "_summary.json")
+
+    try:
+        for job in jobs:
+            print(f"Scraping job: {job['name']}")
+            try:
+                scrap.run(job, session=session, scraped_files=scraped_files)
+            except Exception as e:
+                print(f"An error occurred while scraping job {job['name']}: {e}")
+    finally:
+        session.quit()
+
+    for job in jobs:
+        print(f"Summarizing job: {job['name']}")
+        try:
+            gemini.run(job, pool=gemini_pool, summarized_files=summarized_files, ledger=ledger)
+        except Exception as e:
+            print(f"An error occurred while summarizing job {job['name']}: {e}")
+
+    for job in jobs:
+        print(f"Validating job: {job['name']}")
+        try:
+            gemini.validate_folder(job, pool=gemini_pool, ledger=ledger)
+        except Exception as e:
+            print(f"An error occurred while validating job {job['name']}: {e}")
+
+    for job in jobs:
+        print(f"Uploading job: {job['name']}")
+        try:
+            database_id = notion.run(job, limiter=notion_limiter)
+            print(f"Job {job['name']} uploaded to database {database_id}")
+        except Exception as e:
+            print(f"An error occurred while uploading job {job['name']}: {e}")
+
+def main():
+    jobs_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_JOBS_FILE
+    base_config = load_config("config.yaml")
+    jobs = load_jobs(jobs_file, base_config)
+    if not jobs:
+        print(f"No jobs found in {jobs_file}.")
+        return
+    run_jobs(jobs, base_config)
+    print("All jobs have been executed")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import os
+import json
+import uuid
+import tempfile
+from datetime import datetime
+
+DEFAULT_LEDGER_FILE = "data/ledger.json"
+DEFAULT_OUTPUT_TOKENS = 2048  # expected output tokens per request until the ledger has real numbers
+
+class BudgetExceededError(Exception):
+    """Raised when a request would push the run over its token budget."""
+
+def _empty_totals():
+    return {"requests": 0, "input_tokens": 0, "output_tokens": 0}
+
+def _add_totals(totals, delta):
+    for key in ("requests", "input_tokens", "output_tokens"):
+        totals[key] = totals.get(key, 0) + delta[key]
+
+class TokenLedger:
+    """
+    Records the tokens used by every Gemini request and persists the totals per run and per query.
+
+    Several processes may share one ledger file: each run has its own ID, and every save
+    re-reads the file and merges this run's new usage into it instead of overwriting it.
+
+    :param file_path: Path to the JSON ledger file.
+    :param token_budget: Maximum number of input and output tokens this run may use (None for no limit).
+    """
+    def __init__(self, file_path=DEFAULT_LEDGER_FILE, token_budget=None):
+        self.file_path = file_path
+        self.token_budget = token_budget
+        self.run_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.query = None
+        self.run = {**_empty_totals(), "queries": {}, "models": {}}
+        self.pending_queries = {}  # query totals recorded since the last save
+        self.pending_kinds = {}  # totals per request kind ("summary" or "repair") recorded since the last save
+        self.data = self._load()
+
+    def _load(self):
+        data = {}
+        if os.path.exists(self.file_path):
+            with open(self.file_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        data.setdefault("runs", {})
+        data.setdefault("queries", {})
+        data.setdefault("kinds", {})
+        return data
+
+    def set_query(self, query):
+        """Sets the query that the following requests are counted towards."""
+        self.query = " ".join(str(query).split())
+
+    @property
+    def run_tokens(self):
+        return self.run["input_tokens"] + self.run["output_tokens"]
+
+    def remaining_budget(self):
+        """
+        :return: The tokens left in this run's budget, or None if there is no budget.
+        """
+        if self.token_budget is None:
+            return None
+        return self.token_budget - self.run_tokens
+
+    def _kind_totals(self, kind):
+        totals = dict(self.data["kinds"].get(kind, _empty_totals()))
+        if kind in self.pending_kinds:
+            _add_totals(totals, self.pending_kinds[kind])
+        return totals
+
+    def estimate_output_tokens(self):
+        """
+        :return: The average output tokens of first-pass summary requests so far, or DEFAULT_OUTPUT_TOKENS.
+        """
+        summaries = self._kind_totals("summary")
+        if not summaries["requests"]:
+            return DEFAULT_OUTPUT_TOKENS
+        return summaries["output_tokens"] // summaries["requests"]
+
+    def estimate_repair_tokens(self):
+        """
+        :return: The average input and output tokens spent on repair requests per summarized article so far.
+        """
+        summaries = self._kind_totals("summary")
+        repairs = self._kind_totals("repair")
+        if not summaries["requests"]:
+            return 0
+        return (repairs["input_tokens"] + repairs["output_tokens"]) // summaries["requests"]
+
+    def check(self, input_tokens):
+        """
+        Raises BudgetExceededError if a request of this size would exceed the token budget.
+        """
+        remaining = self.remaining_budget()
+        if remaining is not None and input_tokens + self.estimate_output_tokens() > remaining:
+            raise BudgetExceededError(
+                f"The next request needs about {input_tokens + self.estimate_output_tokens()} tokens "
+                f"but only {remaining} of the {self.token_budget} token budget are left."
+            )
+
+    def record(self, model_name, usage_metadata, kind="summary"):
+        """
+        Adds the actual token usage of a response to the run and query totals and saves the ledger.
+
+        :param model_name: The model that produced the response.
+        :param usage_metadata: The `usage_metadata` of the Gemini response.
+        :param kind: "summary" for a first-pass summary, "repair" for a follow-up request.
+        """
+        delta = {
+            "requests": 1,
+            "input_tokens": getattr(usage_metadata, "prompt_token_count", 0) or 0,
+            "output_tokens": getattr(usage_metadata, "candidates_token_count", 0) or 0,
+        }
+        query = self.query or ""
+        _add_totals(self.run, delta)
+        _add_totals(self.run["queries"].setdefault(query, _empty_totals()), delta)
+        _add_totals(self.run["models"].setdefault(model_name, _empty_totals()), delta)
+        _add_totals(self.pending_queries.setdefault(query, _empty_totals()), delta)
+        _add_totals(self.pending_kinds.setdefault(kind, _empty_totals()), delta)
+        self.save()
+
+    def save(self):
+        """
+        Merges this run into the ledger file as it is on disk now and writes it back atomically.
+        """
+        self.data = self._load()
+        self.data["runs"][self.run_id] = self.run
+        for query, delta in self.pending_queries.items():
+            _add_totals(self.data["queries"].setdefault(query, _empty_totals()), delta)
+        for kind, delta in self.pending_kinds.items():
+            _add_totals(self.data["kinds"].setdefault(kind, _empty_totals()), delta)
+        self.pending_queries = {}
+        self.pending_kinds = {}
+
+        folder = os.path.dirname(self.file_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        fd, temp_path = tempfile.mkstemp(dir=folder or ".", prefix=f"{os.path.basename(self.file_path)}.", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            json.dump(self.data, file, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.file_path)
+
+def create_ledger(config):
+    return TokenLedger(config.get("ledger_file") or DEFAULT_LEDGER_FILE, token_budget=config.get("token_budget"))
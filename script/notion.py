@@ -2,12 +2,18 @@ import os
 import json
 from notion_client import Client
 from datetime import datetime
-from scrap import load_config
+from config import load_config
+from ratelimit import RateLimiter
+from priority import PriorityScheduler
+
+NOTION_REQUESTS_PER_SECOND = 3
+UPLOADS_FILE = "notion_uploads.json"  # records which summaries were uploaded to which database
 
 class NotionJSONUploader:
-    def __init__(self, token, database_id=None):
+    def __init__(self, token, database_id=None, limiter=None):
         self.notion = Client(auth=token)
         self.database_id = database_id
+        self.limiter = limiter or RateLimiter(NOTION_REQUESTS_PER_SECOND, period=1)
         self.debug = True
         self.valid_block_types = {
             "paragraph", "heading_1", "heading_2", "heading_3",
@@ -41,11 +47,17 @@ class NotionJSONUploader:
             chunks.append(current_chunk)
 
         return chunks
+
+    def _request(self, method, **kwargs):
+        """Calls a Notion API method once the shared rate limiter allows it."""
+        self.limiter.wait()
+        return method(**kwargs)
     
     
     def create_new_database(self, parent_page_id, database_title):
         """Creates a new database with the updated schema"""
-        new_database = self.notion.databases.create(
+        new_database = self._request(
+            self.notion.databases.create,
             parent={"type": "page_id", "page_id": parent_page_id},
             title=[{"type": "text", "text": {"content": database_title}}],
             properties={
@@ -173,7 +185,7 @@ class NotionJSONUploader:
             properties["URL"] = {"url": str(json_data["DOI or URL"]).strip()}
 
         # Handle Research Gap
-        if rg := json_data.get("Research Gap Or Problem Statement").get("Research Gap"):
+        if rg := (json_data.get("Research Gap Or Problem Statement") or {}).get("Research Gap"):
             if isinstance(rg, str):
                 content = rg
             else:  # Assume a list of strings
@@ -194,7 +206,7 @@ class NotionJSONUploader:
             }
             
         # Handle Research Design
-        if rg := json_data.get("Methodology").get("Research Design"):
+        if rg := (json_data.get("Methodology") or {}).get("Research Design"):
             if isinstance(rg, str):
                 content = rg
             else:  # Assume a list of strings
@@ -204,7 +216,7 @@ class NotionJSONUploader:
             }
             
         # Handle Comparative Analysis
-        if rg := json_data.get("Experiment").get("Comparative Analysis"):
+        if rg := (json_data.get("Experiment") or {}).get("Comparative Analysis"):
             if isinstance(rg, str):
                 content = rg
             else:  # Assume a list of strings
@@ -214,7 +226,7 @@ class NotionJSONUploader:
             }
             
         # Handle Implications
-        if rg := json_data.get("Results And Discussions").get("Implications"):
+        if rg := (json_data.get("Results And Discussions") or {}).get("Implications"):
             if isinstance(rg, str):
                 content = rg
             else:  # Assume a list of strings
@@ -249,7 +261,8 @@ class NotionJSONUploader:
         block_chunks = self._chunk_blocks(all_blocks, self.MAX_BLOCKS_PER_REQUEST)
         
         # Create initial page with first chunk
-        page = self.notion.pages.create(
+        page = self._request(
+            self.notion.pages.create,
             parent={"database_id": self.database_id},
             properties=properties,
             children=block_chunks[0] if block_chunks else []
@@ -258,19 +271,36 @@ class NotionJSONUploader:
 
         # Append remaining chunks using the append_block_children endpoint
         for chunk in block_chunks[1:]:
-            self.notion.blocks.children.append(
+            self._request(
+                self.notion.blocks.children.append,
                 block_id=page_id,
                 children=chunk
             )
 
         return page_id
 
-def main():
-    config = load_config("config.yaml")
+def load_uploads(folder_path):
+    file_path = os.path.join(folder_path, UPLOADS_FILE)
+    if not os.path.exists(file_path):
+        return {}
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_uploads(folder_path, uploads):
+    with open(os.path.join(folder_path, UPLOADS_FILE), 'w', encoding='utf-8') as f:
+        json.dump(uploads, f, ensure_ascii=False, indent=2)
+
+def run(config, limiter=None):
+    """
+    Uploads every summary of one configuration to its Notion database.
+
+    :param limiter: A shared RateLimiter for Notion API calls.
+    :return: The ID of the database the pages were written to.
+    """
     token = config["notion_api_token"]
     database_id = config.get("database_id")
     
-    uploader = NotionJSONUploader(token, database_id)
+    uploader = NotionJSONUploader(token, database_id, limiter=limiter)
     
     if not database_id:
         parent_page_id = config["parent_page_id"]
@@ -278,16 +308,39 @@ def main():
         uploader.create_new_database(parent_page_id, db_title)
     
     gemini_output_folder = config["gemini_output_folder"]
-    for file in os.listdir(gemini_output_folder):
-        if not file.endswith(".json"):
+    uploads = load_uploads(gemini_output_folder)
+    files = [file for file in os.listdir(gemini_output_folder) if file.endswith("_summary.json")]
+    is_uploaded = lambda file: uploads.get(file, {}).get("database_id") == uploader.database_id
+    files = PriorityScheduler(config).order(
+        files,
+        key=lambda file: file[:-len("_summary.json")],
+        is_done=is_uploaded,
+    )
+    for file in files:
+        if is_uploaded(file):
+            print(f"Already uploaded: {file}")
             continue
         try:
             with open(os.path.join(gemini_output_folder, file), 'r', encoding='utf-8') as f:
                 json_data = json.load(f)
                 page_id = uploader.create_page(json_data)
                 print(f"Successfully created page: {page_id}" if page_id else "Failed to create page")
-        except:
-            print(f"Error processing file: {file}")
+            if page_id:
+                uploads[file] = {"database_id": uploader.database_id, "page_id": page_id}
+                save_uploads(gemini_output_folder, uploads)
+        except Exception as e:
+            print(f"Error processing file: {file}: {e}")
+    return uploader.database_id
+
+def main():
+    from validate import find_invalid_summaries
+    config = load_config("config.yaml")
+
+    # Repair invalid summaries before upload, as `cli.py upload` does
+    if find_invalid_summaries(config["gemini_output_folder"]):
+        import gemini
+        gemini.validate_folder(config)
+    run(config)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,190 @@
+import time
+from collections import deque
+from datetime import date
+import google.generativeai as genai
+from google.api_core.exceptions import ResourceExhausted
+from prompt import construct_response_schema, construct_system_instruction
+from ratelimit import RateLimiter
+
+DEFAULT_RPM = 10
+DEFAULT_TPM = 1000000
+DEFAULT_RPD = 1500
+QUOTA_BACKOFF = 60  # seconds an entry is skipped after the API reports its quota as exhausted
+MAX_QUOTA_BACKOFF = 600
+MAX_QUOTA_STRIKES = 4  # consecutive quota errors after which an entry is treated as out of daily quota
+CHARS_PER_TOKEN = 4  # rough estimate used to check the TPM limit before a call
+
+class QuotaExhaustedError(Exception):
+    """Raised when no entry of the pool can serve requests for the rest of the day."""
+
+class PoolEntry:
+    """
+    One API key and model pair with its own request and token limits.
+    """
+    def __init__(self, apikey, model, priority=0, rpm=DEFAULT_RPM, tpm=DEFAULT_TPM, rpd=DEFAULT_RPD):
+        self.apikey = apikey
+        self.model_name = model
+        self.priority = priority
+        self.tpm = tpm
+        self.rpd = rpd
+        self.limiter = RateLimiter(rpm, period=60)
+        self.token_calls = deque()
+        self.day = date.today()
+        self.daily_calls = 0
+        self.exhausted_until = 0
+        self.strikes = 0
+        self.model = None
+
+    def _tokens_last_minute(self, now):
+        while self.token_calls and now - self.token_calls[0][0] >= 60:
+            self.token_calls.popleft()
+        return sum(tokens for _, tokens in self.token_calls)
+
+    def _reset_day(self):
+        if self.day != date.today():
+            self.day = date.today()
+            self.daily_calls = 0
+
+    def is_exhausted_for_today(self):
+        self._reset_day()
+        return self.daily_calls >= self.rpd
+
+    def time_until_available(self, estimated_tokens):
+        """
+        :return: Seconds until this entry can take a request of the given size (0 if it can now).
+        """
+        now = time.time()
+        wait_time = max(self.exhausted_until - now, self.limiter.time_until_available())
+        if self._tokens_last_minute(now) + estimated_tokens > self.tpm and self.token_calls:
+            wait_time = max(wait_time, 60 - (now - self.token_calls[0][0]))
+        return wait_time
+
+    def try_acquire(self, estimated_tokens):
+        if self.is_exhausted_for_today() or self.time_until_available(estimated_tokens) > 0:
+            return False
+        return self.limiter.try_acquire()
+
+    def record(self, tokens):
+        self.token_calls.append((time.time(), tokens))
+        self.daily_calls += 1
+        self.strikes = 0
+
+    def mark_exhausted(self, daily=False):
+        """
+        Backs off after a quota error. The entry is retired for the rest of the day when the
+        error reports a daily quota or when quota errors keep coming back.
+        """
+        self.strikes += 1
+        if daily or self.strikes >= MAX_QUOTA_STRIKES:
+            self._reset_day()
+            self.daily_calls = self.rpd
+            return
+        self.exhausted_until = time.time() + min(QUOTA_BACKOFF * 2 ** (self.strikes - 1), MAX_QUOTA_BACKOFF)
+
+
+class ModelPool:
+    """
+    Routes Gemini requests to the highest-priority key and model pair that has capacity left.
+
+    Entries with a lower `priority` value are tried first, so secondary models are used only
+    while the primary ones are rate-limited or out of quota.
+    """
+    def __init__(self, entries):
+        if not entries:
+            raise ValueError("The Gemini pool needs at least one entry.")
+        self.entries = sorted(entries, key=lambda entry: entry.priority)
+        self.configured_apikey = None
+
+    def capacity(self):
+        """
+        :return: A tuple of the combined requests per minute, tokens per minute and requests per day of all entries.
+        """
+        return (
+            sum(entry.limiter.max_calls for entry in self.entries),
+            sum(entry.tpm for entry in self.entries),
+            sum(entry.rpd for entry in self.entries),
+        )
+
+    def count_tokens(self, prompt):
+        """
+        Counts the input tokens of a prompt (including the system instruction) with the primary model.
+        Falls back to a rough estimate if the count request fails.
+        """
+        try:
+            return self._get_model(self.entries[0]).count_tokens(prompt).total_tokens
+        except Exception as e:
+            print(f"Could not count tokens, using an estimate instead: {e}")
+            return len(prompt) // CHARS_PER_TOKEN
+
+    def _get_model(self, entry):
+        if self.configured_apikey != entry.apikey:
+            genai.configure(api_key=entry.apikey)
+            self.configured_apikey = entry.apikey
+        if entry.model is None:
+            entry.model = genai.GenerativeModel(entry.model_name, system_instruction=construct_system_instruction())
+        return entry.model
+
+    def _acquire_entry(self, estimated_tokens):
+        while True:
+            for entry in self.entries:
+                if entry.try_acquire(estimated_tokens):
+                    return entry
+            available = [entry for entry in self.entries if not entry.is_exhausted_for_today()]
+            if not available:
+                raise QuotaExhaustedError("Every Gemini key and model in the pool has used up its daily quota.")
+            wait_time = min(entry.time_until_available(estimated_tokens) for entry in available)
+            print(f"Waiting for {wait_time:.2f} seconds to respect the Gemini rate limits.")
+            time.sleep(max(wait_time, 0.1))
+
+    def generate(self, prompt, response_schema=None, input_tokens=None):
+        """
+        Generates a JSON response with the first entry that has capacity.
+
+        :param prompt: The prompt string.
+        :param response_schema: The schema of the response. Defaults to the full summary schema.
+        :param input_tokens: The counted input tokens of the prompt, used to check the TPM limits.
+        :return: A tuple of the response and the name of the model that produced it.
+        """
+        estimated_tokens = input_tokens or len(prompt) // CHARS_PER_TOKEN
+        while True:
+            entry = self._acquire_entry(estimated_tokens)
+            model = self._get_model(entry)
+            try:
+                response = model.generate_content(
+                    prompt,
+                    generation_config=genai.GenerationConfig(
+                        response_mime_type="application/json",
+                        response_schema=response_schema or construct_response_schema(),
+                    ),
+                )
+            except ResourceExhausted as e:
+                daily = "perday" in str(e).replace(" ", "").lower()
+                entry.mark_exhausted(daily)
+                print(f"Quota exhausted for {entry.model_name} (priority {entry.priority}){' for today' if entry.is_exhausted_for_today() else ''}: {e}")
+                continue
+            usage = getattr(response, "usage_metadata", None)
+            entry.record(getattr(usage, "total_token_count", estimated_tokens))
+            return response, entry.model_name
+
+
+def create_pool(config):
+    """
+    Builds the pool from `gemini_pool` in the configuration, or from the single
+    `gemini_apikey` and `gemini_model` pair if no pool is configured.
+    """
+    pool_config = config.get("gemini_pool") or [{
+        "apikey": config["gemini_apikey"],
+        "model": config["gemini_model"],
+    }]
+    entries = [
+        PoolEntry(
+            entry["apikey"],
+            entry["model"],
+            priority=entry.get("priority", idx),
+            rpm=entry.get("rpm", DEFAULT_RPM),
+            tpm=entry.get("tpm", DEFAULT_TPM),
+            rpd=entry.get("rpd", DEFAULT_RPD),
+        )
+        for idx, entry in enumerate(pool_config)
+    ]
+    return ModelPool(entries)
@@ -0,0 +1,113 @@
+import os
+import json
+from datetime import date
+
+CRITERIA = ("missing_stage", "cover_date", "citations", "journal")
+SEARCH_RESULTS_FILE = "search_results.json"
+
+def article_key(search_result):
+    """
+    :return: The name used for an article's files (the DOI suffix), e.g. S0926580523001234.
+    """
+    return search_result.get('prism:doi', '').split('/')[-1]
+
+def save_search_results(search_results, output_folder):
+    """
+    Saves search results next to the scraped articles so later stages can prioritize by them.
+
+    :return: The path of the saved file.
+    """
+    if not os.path.exists(output_folder):
+        os.makedirs(output_folder)
+    file_path = os.path.join(output_folder, SEARCH_RESULTS_FILE)
+    with open(file_path, "w", encoding="utf-8") as file:
+        json.dump(search_results, file, ensure_ascii=False, indent=2)
+    return file_path
+
+def load_search_results(output_folder):
+    """
+    Loads the search results saved by save_search_results, or an empty list if there are none.
+    """
+    file_path = os.path.join(output_folder, SEARCH_RESULTS_FILE)
+    if not os.path.exists(file_path):
+        return []
+    with open(file_path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+def merge_search_results(search_results, output_folder):
+    """
+    Adds search results to the saved ones without dropping records missing from this (partial) list.
+
+    :return: The path of the saved file.
+    """
+    merged = {article_key(record): record for record in load_search_results(output_folder)}
+    merged.update((article_key(record), record) for record in search_results)
+    return save_search_results(list(merged.values()), output_folder)
+
+def _parse_date(date_str):
+    try:
+        return date.fromisoformat(date_str)
+    except (TypeError, ValueError):
+        return None
+
+def _parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+class PriorityScheduler:
+    """
+    Orders the work of every stage so that the most valuable articles are processed first.
+
+    The `priority` configuration lists criteria from most to least important:
+        - missing_stage: articles whose output for the current stage is missing come first
+        - cover_date: newest articles come first
+        - citations: most cited articles (Scopus `citedby-count`) come first
+        - journal: articles from `priority_journals` come first, in the listed order
+    Articles that tie on every criterion keep their original order.
+    """
+    def __init__(self, config):
+        self.criteria = config.get("priority") or []
+        for criterion in self.criteria:
+            if criterion not in CRITERIA:
+                raise ValueError(f"Unknown priority criterion '{criterion}'. Choose from: {', '.join(CRITERIA)}")
+        self.journals = [journal.lower() for journal in config.get("priority_journals") or []]
+        self.records = {}
+        if self.criteria and config.get("scrap_output_folder"):
+            self.records = {article_key(record): record for record in load_search_results(config["scrap_output_folder"])}
+
+    def _sort_key(self, record, done):
+        sort_key = []
+        for criterion in self.criteria:
+            if criterion == "missing_stage":
+                sort_key.append(1 if done else 0)
+            elif criterion == "cover_date":
+                cover_date = _parse_date(record.get("prism:coverDate"))
+                sort_key.append(-cover_date.toordinal() if cover_date else 0)
+            elif criterion == "citations":
+                citations = _parse_int(record.get("citedby-count"))
+                sort_key.append(-citations if citations is not None else 0)
+            elif criterion == "journal":
+                journal = (record.get("prism:publicationName") or "").lower()
+                sort_key.append(self.journals.index(journal) if journal in self.journals else len(self.journals))
+        return sort_key
+
+    def order(self, items, key, record=None, is_done=None):
+        """
+        Sorts the work items of a stage by the configured criteria.
+
+        :param items: The work items (search results, files, ...).
+        :param key: A function returning the article name of an item.
+        :param record: A function returning the search result of an item. Defaults to looking up
+            the saved search results by article name.
+        :param is_done: A function returning whether this stage already produced an item's output.
+        :return: The items in priority order.
+        """
+        if not self.criteria:
+            return list(items)
+        if record is None:
+            record = lambda item: self.records.get(key(item), {})
+        if is_done is None:
+            is_done = lambda item: False
+        return sorted(items, key=lambda item: self._sort_key(record(item), is_done(item)))
@@ -115,6 +115,28 @@ def construct_prompt(article_content):
     return prompt
 
 
+def construct_repair_prompt(article_content, field_names):
+    """
+    Constructs a follow-up prompt that asks only for fields missing from an earlier summary.
+    
+    :param article_content: The content of the article to be summarized.
+    :param field_names: The fields to fill in, e.g. "Methodology > Research Design".
+    :return: The formatted prompt string.
+    """
+    fields = "\n".join(f"- {field_name}" for field_name in field_names)
+    prompt = (
+        "ARTICLE: \"\"\""
+        f"{article_content}"
+        "\"\"\"\n\n"
+        "---\n\n"
+        "An earlier summary of this article was missing or had malformed values for the fields below.\n"
+        "Provide only these fields, following the response schema exactly.\n"
+        "Write the Title, Authors, Publication Date (Month Day, Year), Journal and Keywords in English, and all other fields in Korean.\n\n"
+        f"{fields}\n"
+    )
+    return prompt
+
+
 def construct_response_schema():
     return {
         "type": "OBJECT",
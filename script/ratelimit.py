@@ -0,0 +1,53 @@
+import threading
+import time
+from collections import deque
+
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter that can be shared between threads.
+
+    :param max_calls: Maximum number of calls allowed within one window.
+    :param period: Length of the window in seconds.
+    """
+    def __init__(self, max_calls, period=60):
+        self.max_calls = max_calls
+        self.period = period
+        self.calls = deque()
+        self.lock = threading.Lock()
+
+    def _prune(self, now):
+        while self.calls and now - self.calls[0] >= self.period:
+            self.calls.popleft()
+
+    def try_acquire(self):
+        """
+        Records a call if one is allowed right now.
+
+        :return: True if the call was recorded, False if the limit is reached.
+        """
+        with self.lock:
+            now = time.time()
+            self._prune(now)
+            if len(self.calls) < self.max_calls:
+                self.calls.append(now)
+                return True
+            return False
+
+    def time_until_available(self):
+        """
+        :return: Seconds until the next call is allowed (0 if allowed now).
+        """
+        with self.lock:
+            now = time.time()
+            self._prune(now)
+            if len(self.calls) < self.max_calls:
+                return 0
+            return max(self.period - (now - self.calls[0]), 0)
+
+    def wait(self):
+        """
+        Blocks until a call is allowed, then records it.
+        """
+        while not self.try_acquire():
+            time.sleep(max(self.time_until_available(), 0.01))
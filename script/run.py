@@ -1,13 +1,5 @@
-from scrap import main as scrap_main
-from gemini import main as gemini_main
-from notion import main as notion_main
+from cli import main
 
 if __name__ == "__main__":
 
-    scrap_main()
-    
-    gemini_main()
-    
-    notion_main()
-    
-    print("All scripts have been executed")
+    main(["all"])
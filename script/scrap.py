@@ -3,16 +3,17 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import elsapy.elsclient
-import elsapy.elssearch
+import itertools
 import json
 import shutil
-import yaml
 import re
 import os
 from bs4 import BeautifulSoup
 import time
 import random
+from config import load_config
+from search import perform_search, ScopusSearchClient
+from priority import PriorityScheduler, article_key, save_search_results, merge_search_results
 
 YONSEI_URL = "https://access.yonsei.ac.kr/link.n2s?url="
 
@@ -25,18 +26,6 @@ def clean_text(text):
     text = text.strip()
     return text
 
-def load_config(file_path):
-    with open(file_path, "r", encoding="utf-8") as yaml_file:
-        data_dict = yaml.safe_load(yaml_file)
-    return data_dict
-
-def perform_search(elsevier_apikey, elsevier_query):
-    client = elsapy.elsclient.ElsClient(elsevier_apikey)
-    doc_srch = elsapy.elssearch.ElsSearch(elsevier_query, 'scopus')
-    doc_srch.execute(client, get_all=True)
-    filtered_results = [result for result in doc_srch.results if 'pii' in result]
-    return filtered_results
-
 def login_to_library(driver, wait, yonsei_username, yonsei_password):
     driver.get("https://library.yonsei.ac.kr/login")
     username_input = wait.until(EC.presence_of_element_located((By.XPATH, '//*[@id="id"]')))
@@ -60,109 +49,183 @@ def start_chrome_driver(chrome_user_agent, headless=True):
     driver = webdriver.Chrome(options=chrome_options)
     return driver
 
+class LibrarySession:
+    """
+    A logged-in Chrome session that can be reused across several scraping runs.
+    """
+    def __init__(self, yonsei_username, yonsei_password, chrome_user_agent):
+        self.yonsei_username = yonsei_username
+        self.yonsei_password = yonsei_password
+        self.chrome_user_agent = chrome_user_agent
+        self.driver = None
+        self.wait = None
+
+    def start(self):
+        self.driver = start_chrome_driver(self.chrome_user_agent)
+        self.wait = WebDriverWait(self.driver, 10)
+        login_to_library(self.driver, self.wait, self.yonsei_username, self.yonsei_password)
+
+    def restart(self):
+        self.quit()
+        self.start()
 
-def scrap_articles(yonsei_username, yonsei_password, chrome_user_agent, search_results, output_folder="data/scrap/exp"):
+    def quit(self):
+        if self.driver:
+            self.driver.quit()
+        self.driver = None
+        self.wait = None
 
-    driver = start_chrome_driver(chrome_user_agent)
-    wait = WebDriverWait(driver, 10)
-    login_to_library(driver, wait, yonsei_username, yonsei_password)
+def scrap_articles(yonsei_username, yonsei_password, chrome_user_agent, search_results, output_folder="data/scrap/exp", session=None, scraped_files=None):
+    """
+    Scrapes each search result from ScienceDirect and saves it as a .txt file.
+
+    :param session: An already logged-in LibrarySession. A new one is started (and closed) if omitted.
+    :param scraped_files: A dict mapping DOI suffixes to previously scraped files. Articles found
+        here are copied instead of scraped again, and newly scraped articles are added to it.
+    """
+    owns_session = session is None
+    if owns_session:
+        session = LibrarySession(yonsei_username, yonsei_password, chrome_user_agent)
+    if session.driver is None:
+        session.start()
+    if scraped_files is None:
+        scraped_files = {}
     
     if not os.path.exists(output_folder):
         os.makedirs(output_folder)
     
-    for i, search_result in enumerate(search_results):
-        max_retries = 3
-        retries = 0
-        success = False
-        while retries < max_retries and not success:
-            try:
-                pii = search_result['pii']
-                title = search_result['dc:title']
-                journal = search_result['prism:publicationName']
-                coverDate = search_result['prism:coverDate']
-                first_author = search_result['dc:creator']
-                doi = search_result['prism:doi']
-                doi_suffix = doi.split('/')[-1]
-                file_name = os.path.join(output_folder, f"{doi_suffix}.txt")
+    try:
+        for i, search_result in enumerate(search_results):
+            doi_suffix = search_result.get('prism:doi', '').split('/')[-1]
+            file_name = os.path.join(output_folder, f"{doi_suffix}.txt")
+            scraped_file = scraped_files.get(doi_suffix)
+            if doi_suffix and scraped_file and os.path.exists(scraped_file):
+                if os.path.abspath(scraped_file) != os.path.abspath(file_name):
+                    shutil.copyfile(scraped_file, file_name)
+                print(f"Reused previously scraped text for article {i+1}")
+                continue
+
+            max_retries = 3
+            retries = 0
+            success = False
+            while retries < max_retries and not success:
+                try:
+                    pii = search_result['pii']
+                    title = search_result['dc:title']
+                    journal = search_result['prism:publicationName']
+                    coverDate = search_result['prism:coverDate']
+                    first_author = search_result['dc:creator']
+                    doi = search_result['prism:doi']
                 
-                article_url = f"{YONSEI_URL}https://www.sciencedirect.com/science/article/pii/{pii}"
-                article_url_02 = f"https://www.sciencedirect.com/science/article/pii/{pii}"
+                    article_url = f"{YONSEI_URL}https://www.sciencedirect.com/science/article/pii/{pii}"
+                    article_url_02 = f"https://www.sciencedirect.com/science/article/pii/{pii}"
                 
-                driver.get(article_url)
-                time.sleep(2 + (5 - 2) * random.betavariate(2, 5))
+                    session.driver.get(article_url)
+                    time.sleep(2 + (5 - 2) * random.betavariate(2, 5))
                 
-                content_element = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#body > div")))
-                content_html = content_element.get_attribute('innerHTML')
+                    content_element = session.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "#body > div")))
+                    content_html = content_element.get_attribute('innerHTML')
                 
-                soup = BeautifulSoup(content_html, 'html.parser')
-                sections = soup.find_all('section')
+                    soup = BeautifulSoup(content_html, 'html.parser')
+                    sections = soup.find_all('section')
                 
-                extracted_text = [
-                    f"Title: {title}",
-                    f"Journal: {journal}",
-                    f"Cover Date: {coverDate}",
-                    f"URL: {article_url_02}",
-                    f"First Author: {first_author}"
-                ]
+                    extracted_text = [
+                        f"Title: {title}",
+                        f"Journal: {journal}",
+                        f"Cover Date: {coverDate}",
+                        f"URL: {article_url_02}",
+                        f"First Author: {first_author}"
+                    ]
                 
-                for section in sections:
-                    for ref in section.find_all('a', class_='anchor anchor-primary'):
-                        ref.decompose()
-                    for figure in section.find_all('figure'):
-                        figure.decompose()
-                    text = section.get_text(separator='\n', strip=True)
-                    cleaned_text = clean_text(text)
-                    extracted_text.append(cleaned_text)
+                    for section in sections:
+                        for ref in section.find_all('a', class_='anchor anchor-primary'):
+                            ref.decompose()
+                        for figure in section.find_all('figure'):
+                            figure.decompose()
+                        text = section.get_text(separator='\n', strip=True)
+                        cleaned_text = clean_text(text)
+                        extracted_text.append(cleaned_text)
                 
-                full_text = '\n\n'.join(extracted_text)
-                with open(file_name, 'w', encoding='utf-8') as file:
-                    file.write(full_text)
+                    full_text = '\n\n'.join(extracted_text)
+                    with open(file_name, 'w', encoding='utf-8') as file:
+                        file.write(full_text)
                 
-                # New file size validation
-                file_size = os.path.getsize(file_name)
-                if file_size < 1024*4:  # 4KB threshold
-                    os.remove(file_name)  # Delete undersized file
-                    raise ValueError(
-                        f"Generated file size {file_size} bytes < 4KB. "
-                        "Possible incomplete content."
-                    )
+                    # New file size validation
+                    file_size = os.path.getsize(file_name)
+                    if file_size < 1024*4:  # 4KB threshold
+                        os.remove(file_name)  # Delete undersized file
+                        raise ValueError(
+                            f"Generated file size {file_size} bytes < 4KB. "
+                            "Possible incomplete content."
+                        )
                 
-                print(f"Text extracted and saved for article {i+1}")
-                success = True
+                    scraped_files[doi_suffix] = file_name
+                    print(f"Text extracted and saved for article {i+1}")
+                    success = True
                 
-            except Exception as e:
-                print(f"Error processing article {i+1}: {e}")
-                if driver:
-                    driver.quit()
-                # Reinitialize driver and login
-                driver = start_chrome_driver(chrome_user_agent)
-                wait = WebDriverWait(driver, 10)
-                login_to_library(driver, wait, yonsei_username, yonsei_password)
-                retries += 1
-                if retries >= max_retries:
-                    print(f"Max retries reached for article {i+1}. Skipping.")
-        if not success:
-            print(f"Skipping article {i+1} after {retries} retries.")
-    
-    driver.quit()
+                except Exception as e:
+                    print(f"Error processing article {i+1}: {e}")
+                    # Reinitialize driver and login
+                    session.restart()
+                    retries += 1
+                    if retries >= max_retries:
+                        print(f"Max retries reached for article {i+1}. Skipping.")
+            if not success:
+                print(f"Skipping article {i+1} after {retries} retries.")
+    finally:
+        if owns_session:
+            session.quit()
     print("Scraping completed.")
 
-def main():
-    config = load_config("config.yaml")
+def run(config, session=None, scraped_files=None):
+    client = ScopusSearchClient(
+        config['elsevier_apikey'],
+        max_workers=config.get('elsevier_max_workers', 4),
+        requests_per_second=config.get('elsevier_requests_per_second', 5),
+    )
+    search_results = perform_search(config['elsevier_apikey'], config['elsevier_query'], client=client)
+    first_result = next(search_results, None)
+    if first_result is None:
+        print('No search results found.')
+        return
+    search_results = itertools.chain([first_result], search_results)
+    
+    output_folder = config["scrap_output_folder"]
+    seen_results = []
+    search_finished = False
+    def collect(results):
+        nonlocal search_finished
+        for result in results:
+            seen_results.append(result)
+            yield result
+        search_finished = not client.failed_pages
+    search_results = collect(search_results)
     
-    search_results = perform_search(config['elsevier_apikey'], config['elsevier_query'])
-    if not search_results or 'error' in search_results[0]:
-        print('No search results found. Exiting program.')
-        exit()
-    else:
-        print(f"Found {len(search_results)} search results.")
+    # Prioritizing needs every record, otherwise records are scraped as they arrive
+    scheduler = PriorityScheduler(config)
+    if scheduler.criteria:
+        search_results = scheduler.order(
+            list(search_results),
+            key=article_key,
+            record=lambda result: result,
+            is_done=lambda result: os.path.exists(os.path.join(output_folder, f"{article_key(result)}.txt")),
+        )
     
     try:
-        scrap_articles(config["yonsei_username"], config["yonsei_password"], config["chrome_user_agent"], search_results, output_folder=config["scrap_output_folder"])
+        scrap_articles(config["yonsei_username"], config["yonsei_password"], config["chrome_user_agent"], search_results, output_folder=output_folder, session=session, scraped_files=scraped_files)
     except Exception as e:
         print(f"An error occurred during scraping: {e}")
     finally:
+        # A partial search must not replace the records saved by an earlier complete one
+        if search_finished:
+            save_search_results(seen_results, output_folder)
+        else:
+            merge_search_results(seen_results, output_folder)
         print("Scraping process completed.")
 
+def main():
+    config = load_config("config.yaml")
+    run(config)
+
 if __name__ == "__main__":
     main()
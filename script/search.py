@@ -0,0 +1,106 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+from ratelimit import RateLimiter
+
+SCOPUS_SEARCH_URL = "https://api.elsevier.com/content/search/scopus"
+MAX_RESULTS = 5000  # Scopus refuses start offsets beyond this without a cursor
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class ScopusSearchClient:
+    """
+    Scopus search client that fetches result pages concurrently.
+
+    :param apikey: Elsevier API key.
+    :param page_size: Number of records requested per page (Scopus allows up to 25).
+    :param max_workers: Number of pages fetched at the same time.
+    :param requests_per_second: Maximum number of API requests per second.
+    """
+    def __init__(self, apikey, page_size=25, max_workers=4, requests_per_second=5):
+        self.apikey = apikey
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(requests_per_second, period=1)
+        self.session = requests.Session()
+        self.session.headers.update({
+            "X-ELS-APIKey": apikey,
+            "Accept": "application/json",
+        })
+        self.total_results = None
+        self.failed_pages = []
+
+    def _fetch_page(self, query, start, max_retries=3):
+        for retry in range(max_retries):
+            last_retry = retry == max_retries - 1
+            wait_time = 2 ** (retry + 1)
+            self.limiter.wait()
+            try:
+                response = self.session.get(
+                    SCOPUS_SEARCH_URL,
+                    params={"query": query, "start": start, "count": self.page_size},
+                    timeout=30,
+                )
+            except (requests.Timeout, requests.ConnectionError) as e:
+                if last_retry:
+                    raise
+                print(f"Scopus request failed at offset {start}: {e}. Retrying in {wait_time} seconds.")
+                time.sleep(wait_time)
+                continue
+            if response.status_code in RETRY_STATUS_CODES and not last_retry:
+                print(f"Scopus returned {response.status_code} at offset {start}. Retrying in {wait_time} seconds.")
+                time.sleep(wait_time)
+                continue
+            response.raise_for_status()
+            return response.json()["search-results"]
+
+    def search(self, query):
+        """
+        Runs a Scopus search and yields records as their pages arrive.
+
+        The first page is fetched on its own to read the total result count,
+        then the remaining pages are fetched concurrently in the background.
+        Pages that still fail after retrying are logged and skipped; their offsets
+        are kept in `failed_pages`.
+
+        :param query: Scopus advanced search query.
+        :return: A generator of search result records.
+        """
+        first_page = self._fetch_page(query, 0)
+        self.total_results = int(first_page.get("opensearch:totalResults", 0))
+        print(f"Found {self.total_results} search results.")
+        fetch_results = min(self.total_results, MAX_RESULTS)
+        if self.total_results > MAX_RESULTS:
+            print(
+                f"WARNING: Scopus only returns the first {MAX_RESULTS} results without a cursor. "
+                f"{self.total_results - MAX_RESULTS} results will be skipped; narrow the query to include them."
+            )
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {
+                executor.submit(self._fetch_page, query, start): start
+                for start in range(self.page_size, fetch_results, self.page_size)
+            }
+            yield from first_page.get("entry", [])
+            for future in as_completed(futures):
+                start = futures[future]
+                try:
+                    page = future.result()
+                except Exception as e:
+                    print(f"Skipping Scopus results at offset {start}: {e}")
+                    self.failed_pages.append(start)
+                    continue
+                yield from page.get("entry", [])
+        finally:
+            # Do not wait for the remaining pages if the consumer stopped early
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def perform_search(elsevier_apikey, elsevier_query, max_workers=4, requests_per_second=5, client=None):
+    if client is None:
+        client = ScopusSearchClient(elsevier_apikey, max_workers=max_workers, requests_per_second=requests_per_second)
+    for result in client.search(elsevier_query):
+        if 'pii' in result:
+            yield result
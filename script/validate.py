@@ -0,0 +1,112 @@
+import os
+import json
+from prompt import construct_response_schema
+
+
+def validate_summary(data, schema, path=()):
+    """
+    Checks a summary against the response schema.
+
+    :param data: The parsed summary.
+    :param schema: The response schema from construct_response_schema().
+    :param path: The path of `data` within the summary (used for recursion).
+    :return: A list of paths (tuples of property names) that are missing or malformed.
+    """
+    schema_type = schema.get("type")
+    if schema_type == "OBJECT":
+        if not isinstance(data, dict):
+            return [path]
+        errors = []
+        for key, property_schema in schema.get("properties", {}).items():
+            if key not in data:
+                if key in schema.get("required", []):
+                    errors.append(path + (key,))
+                continue
+            errors.extend(validate_summary(data[key], property_schema, path + (key,)))
+        return errors
+    if schema_type == "ARRAY":
+        if not isinstance(data, list):
+            return [path]
+        for item in data:
+            if validate_summary(item, schema.get("items", {}), path):
+                return [path]
+        return []
+    if schema_type == "STRING":
+        return [] if isinstance(data, str) else [path]
+    return []
+
+def build_repair_schema(schema, paths):
+    """
+    Builds a reduced response schema that only asks for the given paths.
+    """
+    repair_schema = {"type": "OBJECT", "required": [], "properties": {}}
+    for path in paths:
+        current_schema = schema
+        current_repair = repair_schema
+        for depth, key in enumerate(path):
+            property_schema = current_schema["properties"][key]
+            if key not in current_repair["required"]:
+                current_repair["required"].append(key)
+            if depth == len(path) - 1:
+                current_repair["properties"][key] = property_schema
+            else:
+                current_repair = current_repair["properties"].setdefault(
+                    key, {"type": "OBJECT", "required": [], "properties": {}}
+                )
+                current_schema = property_schema
+    return repair_schema
+
+def merge_repair(data, repair, paths):
+    """
+    Writes the repaired values for the given paths into the summary.
+
+    :return: The updated summary.
+    """
+    if not isinstance(data, dict):
+        data = {}
+    for path in paths:
+        value = repair
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            target = data
+            for key in path[:-1]:
+                if not isinstance(target.get(key), dict):
+                    target[key] = {}
+                target = target[key]
+            target[path[-1]] = value
+    return data
+
+def load_summary(text):
+    """
+    Parses a summary, returning an empty dict if it is not a valid JSON object.
+    """
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def format_path(path):
+    return " > ".join(path) if path else "(entire summary)"
+
+def find_invalid_summaries(folder_path):
+    """
+    Finds the saved summaries in a folder that do not match the response schema.
+
+    :param folder_path: Path to the folder containing *_summary.json files.
+    :return: A list of tuples of the file path, the parsed summary and its invalid paths.
+    """
+    schema = construct_response_schema()
+    invalid_summaries = []
+    for filename in os.listdir(folder_path):
+        if not filename.endswith("_summary.json"):
+            continue
+        file_path = os.path.join(folder_path, filename)
+        with open(file_path, 'r', encoding='utf-8') as file:
+            summary = load_summary(file.read())
+        if errors := validate_summary(summary, schema):
+            invalid_summaries.append((file_path, summary, errors))
+    return invalid_summaries